@@ -0,0 +1,72 @@
+"""
+Observation-to-action cache for the Sumo inference server.
+
+The exported model is deterministic (action means, discrete actions
+thresholded at 0), so nearly identical observations - idle agents, reset
+poses, the spawn positions at the start of each round - always produce the
+same actions. Observations are quantized to a fixed tolerance and used as
+keys into a bounded LRU cache, so repeated match phases skip the ONNX call.
+
+Entries are tagged with the model they were computed from: binding the cache
+to a different model clears it, and results computed with any other model
+than the bound one are never stored.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ActionCache:
+    def __init__(self, max_size: int = 4096, tolerance: float = 1e-3):
+        if tolerance <= 0:
+            raise ValueError(f"Cache tolerance must be positive, got {tolerance}")
+        self.max_size = max_size
+        self.tolerance = tolerance
+        self.model_id = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, obs) -> bytes:
+        """Quantize obs onto a grid of `tolerance` and pack it into a hashable key."""
+        grid = np.floor(np.asarray(obs, dtype=np.float64) / self.tolerance + 0.5)
+        return grid.astype(np.int64).tobytes()
+
+    def get(self, key: bytes):
+        with self._lock:
+            actions = self._entries.get(key)
+            if actions is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return actions
+
+    def put(self, key: bytes, actions: dict, model_id: str):
+        """Store actions computed with model_id (dropped if the cache was rebound meanwhile)."""
+        with self._lock:
+            if model_id != self.model_id:
+                return
+            self._entries[key] = actions
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def bind(self, model_id: str):
+        """Associate the cache with a model, dropping entries from any other model."""
+        with self._lock:
+            if model_id != self.model_id:
+                self._entries.clear()
+                self.model_id = model_id
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
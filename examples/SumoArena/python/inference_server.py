@@ -11,38 +11,143 @@ Usage:
 The server listens on localhost:11100 and expects JSON messages:
     Request:  {"obs": [15 floats]}
     Response: {"actions": {"move": [...], "turn": [...], "charge": N, ...}}
+
+After re-exporting the model to the same path, send {"type": "reload"} to
+swap it in without restarting; the reply is {"type": "reloaded", ...}.
+
+Request counters, error counts and per-stage latency histograms are served
+as plain text on localhost:11101/metrics (disable with --metrics_port 0).
+
+With --cache_size N, actions for (quantized) repeated observations are served
+from an LRU cache instead of calling the model. Cache entries are tied to the
+hash of the loaded model (including its .onnx.data weights file, if any), so
+a reload that changes the model clears the cache.
 """
 
 import argparse
+import hashlib
 import json
 import socket
 import threading
+import time
 from pathlib import Path
 
 import numpy as np
 import onnxruntime as ort
 
+from action_cache import ActionCache
+from metrics import MetricsRegistry, start_metrics_server
+
 
 class InferenceServer:
-    def __init__(self, model_path: str, host: str = "127.0.0.1", port: int = 11100):
+    def __init__(
+        self,
+        model_path: str,
+        host: str = "127.0.0.1",
+        port: int = 11100,
+        metrics_port: int = 11101,
+        cache_size: int = 0,
+        cache_tolerance: float = 1e-3,
+    ):
         self.host = host
         self.port = port
+        self.metrics_port = metrics_port
+        self.metrics = MetricsRegistry()
+        self.metrics_server = None
 
-        # Load ONNX model
-        print(f"Loading model from {model_path}...")
-        self.session = ort.InferenceSession(model_path)
-        self.input_name = self.session.get_inputs()[0].name
-        print(f"Model loaded! Input: {self.input_name}")
+        # Optional observation -> action cache (0 = disabled)
+        self.cache = ActionCache(cache_size, cache_tolerance) if cache_size > 0 else None
+        self.metrics.cache = self.cache
+
+        self.model_path = model_path
+        self.model = None  # (session, input_name, model_id), swapped as one unit
+        self.reload_lock = threading.Lock()
+        self.load_model()
 
         self.server_socket = None
         self.running = False
 
-    def run_inference(self, obs: list) -> dict:
-        """Run inference on observation, return action dict."""
+    @property
+    def session(self) -> ort.InferenceSession:
+        return self.model[0]
+
+    @property
+    def input_name(self) -> str:
+        return self.model[1]
+
+    def load_model(self) -> bool:
+        """(Re)load the ONNX model from model_path and bind the action cache to it.
+
+        Returns whether the model differs from the one previously loaded. On
+        failure the exception propagates and the current model stays in use.
+        """
+        with self.reload_lock:
+            print(f"Loading model from {self.model_path}...")
+            # Load from the path so external weights (.onnx.data) resolve next to it
+            session = ort.InferenceSession(self.model_path)
+            input_name = session.get_inputs()[0].name
+            model_id = self.model_fingerprint(self.model_path)
+            changed = self.model is None or self.model[2] != model_id
+            self.model = (session, input_name, model_id)
+            if self.cache is not None:
+                self.cache.bind(model_id)
+            print(f"Model loaded! Input: {input_name} (sha1 {model_id[:12]})")
+            return changed
+
+    @staticmethod
+    def model_fingerprint(model_path: str) -> str:
+        """Hash the model file plus its external weights, which a re-export may change alone."""
+        digest = hashlib.sha1()
+        for path in (Path(model_path), Path(model_path + ".data")):
+            if path.exists():
+                digest.update(path.name.encode("utf-8"))
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+        return digest.hexdigest()
+
+    def run_inference(self, obs: list, metrics=None) -> dict:
+        """Run inference on observation, return action dict.
+
+        If `metrics` (a ConnectionMetrics) is given, the cache lookup, model
+        call and decode are timed into it.
+        """
+        # One consistent snapshot: a cached entry must come from the model it is tagged with
+        model = self.model
+        cache = self.cache
+        clock = time.perf_counter
+        t0 = clock()
+
+        if cache is not None:
+            key = cache.key(obs)
+            actions = cache.get(key)
+            t1 = clock()
+            if metrics is not None:
+                metrics.observe("cache", t1 - t0)
+            if actions is not None:
+                return actions
+            t0 = t1
+
+        action_array = self.forward(obs, model)
+        t1 = clock()
+        actions = self.decode_actions(action_array)
+        if metrics is not None:
+            metrics.observe("inference", t1 - t0)
+            metrics.observe("decode", clock() - t1)
+
+        if cache is not None:
+            cache.put(key, actions, model[2])
+        return actions
+
+    def forward(self, obs: list, model: tuple = None) -> np.ndarray:
+        """Run the ONNX session on a single observation, return raw outputs."""
+        session, input_name, _ = model or self.model
         obs_array = np.array([obs], dtype=np.float32)
-        outputs = self.session.run(None, {self.input_name: obs_array})
-        action_array = outputs[0][0]  # First output, first batch
+        outputs = session.run(None, {input_name: obs_array})
+        return outputs[0][0]  # First output, first batch
 
+    def decode_actions(self, action_array: np.ndarray) -> dict:
+        """Convert raw model outputs into the action dict Godot expects."""
         # Model outputs 5 values (action means only):
         # [0] move (continuous, -1 to 1)
         # [1] turn (continuous, -1 to 1)
@@ -64,6 +169,8 @@ class InferenceServer:
         """Handle a single client connection."""
         print(f"Client connected: {addr}")
         buffer = ""
+        metrics = self.metrics.connect(f"{addr[0]}:{addr[1]}")
+        clock = time.perf_counter
 
         try:
             while self.running:
@@ -74,33 +181,61 @@ class InferenceServer:
                 buffer += data.decode('utf-8')
 
                 # Process complete JSON messages (newline-delimited)
+                metrics.pending = buffer.count('\n')
                 while '\n' in buffer:
                     line, buffer = buffer.split('\n', 1)
+                    metrics.pending -= 1
                     if not line.strip():
                         continue
 
                     try:
+                        t0 = clock()
                         request = json.loads(line)
+                        t1 = clock()
+                        metrics.observe("parse", t1 - t0)
 
                         if request.get("type") == "inference":
+                            metrics.count_request("inference")
                             obs = request.get("obs", [])
-                            actions = self.run_inference(obs)
-                            response = {"type": "actions", "actions": actions}
+                            try:
+                                actions = self.run_inference(obs, metrics)
+                                response = {"type": "actions", "actions": actions}
+                            except Exception as e:
+                                # e.g. obs of the wrong length: report it, keep the client
+                                metrics.count_error("inference")
+                                response = {"type": "error", "message": f"Inference failed: {e}"}
+                            t1 = clock()
+                        elif request.get("type") == "reload":
+                            metrics.count_request("reload")
+                            try:
+                                changed = self.load_model()
+                                response = {"type": "reloaded", "model": self.model[2][:12], "changed": changed}
+                            except Exception as e:
+                                metrics.count_error("reload")
+                                response = {"type": "error", "message": f"Reload failed: {e}"}
+                            t1 = clock()
                         elif request.get("type") == "ping":
+                            metrics.count_request("ping")
                             response = {"type": "pong"}
                         else:
+                            metrics.count_request("unknown")
+                            metrics.count_error("unknown_type")
                             response = {"type": "error", "message": "Unknown request type"}
 
                         client_socket.send((json.dumps(response) + '\n').encode('utf-8'))
+                        metrics.observe("send", clock() - t1)
 
                     except json.JSONDecodeError as e:
+                        metrics.count_error("invalid_json")
                         error_response = {"type": "error", "message": f"Invalid JSON: {e}"}
                         client_socket.send((json.dumps(error_response) + '\n').encode('utf-8'))
 
         except Exception as e:
+            metrics.count_error("connection")
             print(f"Client error: {e}")
         finally:
             print(f"Client disconnected: {addr}")
+            self.metrics.disconnect(metrics)
             client_socket.close()
 
     def start(self):
@@ -112,10 +247,19 @@ class InferenceServer:
         self.server_socket.settimeout(1.0)  # Allow checking self.running
         self.running = True
 
+        if self.metrics_port:
+            try:
+                self.metrics_server = start_metrics_server(self.metrics, self.host, self.metrics_port)
+            except OSError as e:
+                # Metrics are optional: keep serving inference without them
+                print(f"Warning: metrics endpoint disabled, could not bind port {self.metrics_port}: {e}")
+
         print(f"\n{'='*50}")
         print(f"Inference Server Running")
         print(f"{'='*50}")
         print(f"Host: {self.host}:{self.port}")
+        if self.metrics_server:
+            print(f"Metrics: http://{self.host}:{self.metrics_port}/metrics")
         print(f"Waiting for Godot to connect...")
         print(f"Press Ctrl+C to stop")
         print(f"{'='*50}\n")
@@ -134,9 +278,15 @@ class InferenceServer:
                     continue
         except KeyboardInterrupt:
             print("\nShutting down...")
+            if self.cache is not None:
+                print(f"Action cache: {self.cache.hits} hits, {self.cache.misses} misses "
+                      f"({self.cache.hit_rate():.1%} hit rate)")
         finally:
             self.running = False
             self.server_socket.close()
+            if self.metrics_server:
+                self.metrics_server.shutdown()
+                self.metrics_server.server_close()
 
 
 def main():
@@ -153,6 +303,24 @@ def main():
         default=11100,
         help="Port to listen on (default: 11100)",
     )
+    parser.add_argument(
+        "--metrics_port",
+        type=int,
+        default=11101,
+        help="Port for the plain-text metrics endpoint, 0 to disable (default: 11101)",
+    )
+    parser.add_argument(
+        "--cache_size",
+        type=int,
+        default=0,
+        help="Max cached observation -> action entries, 0 to disable (default: 0)",
+    )
+    parser.add_argument(
+        "--cache_tolerance",
+        type=float,
+        default=1e-3,
+        help="Observations within this step of each other share a cache entry (default: 0.001)",
+    )
     args = parser.parse_args()
 
     model_path = Path(args.model)
@@ -164,7 +332,13 @@ def main():
             print(f"Error: Model not found at {args.model}")
             return
 
-    server = InferenceServer(str(model_path), port=args.port)
+    server = InferenceServer(
+        str(model_path),
+        port=args.port,
+        metrics_port=args.metrics_port,
+        cache_size=args.cache_size,
+        cache_tolerance=args.cache_tolerance,
+    )
     server.start()
 
 
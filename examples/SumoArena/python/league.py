@@ -0,0 +1,320 @@
+"""
+Self-play league for Sumo training.
+
+Instead of every arena pitting the live policy against itself, a share of the
+arenas in multi_training.tscn put the live policy against a frozen past
+version sampled from a bounded opponent pool. This avoids the strategy
+cycling you get from pure self-play.
+
+Godot registers agents in scene-tree order, so the vectorized env lays them
+out as [Arena1/Agent1, Arena1/Agent2, Arena2/Agent1, ...]. In league arenas
+Agent2 (the odd slot) is driven by a frozen snapshot and hidden from PPO;
+the learner only ever sees the remaining slots.
+
+Snapshots are stored as plain numpy weights (no torch modules, optimizer or
+value head), and all opponents using the same snapshot are evaluated in one
+batched forward pass per step.
+"""
+
+import math
+import os
+import random
+from collections import OrderedDict, defaultdict
+from glob import glob
+
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnvWrapper
+
+_ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0.0),
+}
+
+
+class FrozenPolicy:
+    """Inference-only copy of an SB3 actor (features -> MLP -> Gaussian mean)."""
+
+    def __init__(self, obs_keys, layers, activation, mean_w, mean_b, log_std, low, high):
+        self.obs_keys = obs_keys  # Dict obs keys in extractor order (None for Box obs)
+        self.layers = layers  # [(W, b), ...] hidden layers
+        self.activation = activation
+        self.mean_w = mean_w
+        self.mean_b = mean_b
+        self.std = np.exp(log_std)
+        self.low = low
+        self.high = high
+
+    @classmethod
+    def from_sb3(cls, policy) -> "FrozenPolicy":
+        """Copy the actor weights out of a stable-baselines3 ActorCriticPolicy."""
+        if not hasattr(policy, "log_std"):
+            raise ValueError("Only Box (Gaussian) action spaces are supported")
+
+        def to_numpy(tensor):
+            return tensor.detach().cpu().numpy().astype(np.float32)
+
+        # act() re-implements the features extractor as a plain flatten/concat,
+        # so refuse anything that does more than that
+        extractor = policy.features_extractor if policy.share_features_extractor else policy.pi_features_extractor
+        extractor_name = type(extractor).__name__
+        if extractor_name == "FlattenExtractor":
+            obs_keys = None
+        elif extractor_name == "CombinedExtractor":
+            sub_names = {type(sub).__name__ for sub in extractor.extractors.values()}
+            if sub_names - {"Flatten"}:
+                raise ValueError(f"Unsupported CombinedExtractor sub-extractors: {sorted(sub_names)}")
+            obs_keys = list(extractor.extractors.keys())
+        else:
+            raise ValueError(f"Unsupported features extractor: {extractor_name}")
+
+        layers = []
+        activation = None
+        for module in policy.mlp_extractor.policy_net:
+            name = type(module).__name__
+            if name == "Linear":
+                layers.append((to_numpy(module.weight).T.copy(), to_numpy(module.bias)))
+            elif name in _ACTIVATIONS:
+                activation = _ACTIVATIONS[name]
+            else:
+                raise ValueError(f"Unsupported policy layer: {name}")
+
+        return cls(
+            obs_keys=obs_keys,
+            layers=layers,
+            activation=activation,
+            mean_w=to_numpy(policy.action_net.weight).T.copy(),
+            mean_b=to_numpy(policy.action_net.bias),
+            log_std=to_numpy(policy.log_std),
+            low=policy.action_space.low.astype(np.float32),
+            high=policy.action_space.high.astype(np.float32),
+        )
+
+    def check_parity(self, policy, n_samples: int = 16, atol: float = 1e-4):
+        """Raise if deterministic actions differ from policy.predict() on sampled observations."""
+        space = policy.observation_space
+        samples = [space.sample() for _ in range(n_samples)]
+        if isinstance(samples[0], dict):
+            obs = {k: np.stack([sample[k] for sample in samples]) for k in samples[0]}
+        else:
+            obs = np.stack(samples)
+        expected, _ = policy.predict(obs, deterministic=True)
+        actual = self.act(obs, deterministic=True)
+        error = float(np.max(np.abs(actual - expected)))
+        if error > atol:
+            raise RuntimeError(f"Frozen policy does not match the live policy (max abs error {error:.2e})")
+
+    def act(self, obs, deterministic: bool = False, rng: np.random.Generator = None) -> np.ndarray:
+        """Batched actions for obs of shape (batch, ...), clipped like SB3 does."""
+        if self.obs_keys is None:
+            x = obs.reshape(len(obs), -1)
+        else:
+            x = np.concatenate([obs[k].reshape(len(obs[k]), -1) for k in self.obs_keys], axis=1)
+        x = x.astype(np.float32, copy=False)
+
+        for w, b in self.layers:
+            x = self.activation(x @ w + b)
+        actions = x @ self.mean_w + self.mean_b
+
+        if not deterministic:
+            rng = rng or np.random.default_rng()
+            actions = actions + rng.standard_normal(actions.shape, dtype=np.float32) * self.std
+        return np.clip(actions, self.low, self.high)
+
+
+class OpponentPool:
+    """Bounded pool of frozen snapshots with least-recently-used eviction.
+
+    "Used" means added or assigned to an opponent slot via acquire(). When the
+    pool is full the least recently used snapshot is evicted, preferring ones
+    no slot is currently playing. Snapshots that have never been played are
+    only evicted when nothing else is left, so fresh snapshots get games even
+    when they are added faster than episodes end.
+    """
+
+    def __init__(self, max_size: int = 8, seed: int = None):
+        self.max_size = max_size
+        self._snapshots = OrderedDict()
+        self._in_use = defaultdict(int)  # name -> number of slots playing it
+        self._played = set()  # names that have been assigned at least once
+        self._random = random.Random(seed)
+
+    def __len__(self):
+        return len(self._snapshots)
+
+    def __contains__(self, name):
+        return name in self._snapshots
+
+    def names(self) -> list:
+        return list(self._snapshots)
+
+    def add(self, name: str, policy: FrozenPolicy):
+        self._snapshots[name] = policy
+        self._snapshots.move_to_end(name)
+        while len(self._snapshots) > self.max_size:
+            candidates = [n for n in self._snapshots if n != name]
+            played = [n for n in candidates if n in self._played]
+            idle = [n for n in played if not self._in_use.get(n)]
+            # Slots playing an evicted snapshot draw a new opponent next step
+            evicted = (idle or played or candidates)[0]
+            del self._snapshots[evicted]
+            self._in_use.pop(evicted, None)
+            self._played.discard(evicted)
+            print(f"[League] Evicted snapshot {evicted}")
+
+    def add_from_model(self, name: str, model):
+        frozen = FrozenPolicy.from_sb3(model.policy)
+        frozen.check_parity(model.policy)
+        self.add(name, frozen)
+
+    def load_checkpoints(self, directory: str, pattern: str = "sumo_ppo_*.zip", reserve: int = 0):
+        """Seed the pool with the newest saved checkpoints, leaving `reserve` slots free."""
+        from stable_baselines3 import PPO
+
+        paths = sorted(glob(os.path.join(directory, pattern)), key=os.path.getmtime)
+        keep = max(self.max_size - reserve, 0)
+        paths = paths[len(paths) - keep:] if keep else []
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0]
+            self.add_from_model(name, PPO.load(path, device="cpu"))
+        return len(paths)
+
+    def sample(self) -> str:
+        if not self._snapshots:
+            raise RuntimeError("Opponent pool is empty")
+        return self._random.choice(list(self._snapshots))
+
+    def acquire(self) -> str:
+        """Sample a snapshot for an opponent slot and mark it as recently used."""
+        name = self.sample()
+        self._snapshots.move_to_end(name)
+        self._in_use[name] += 1
+        self._played.add(name)
+        return name
+
+    def release(self, name: str):
+        """Free a slot's claim on a snapshot (no-op if it was already evicted)."""
+        if self._in_use.get(name):
+            self._in_use[name] -= 1
+
+    def get(self, name: str) -> FrozenPolicy:
+        return self._snapshots[name]
+
+
+class LeagueVecEnv(VecEnvWrapper):
+    """Hides frozen-opponent slots from the learner and drives them from the pool."""
+
+    def __init__(self, venv, pool: OpponentPool, share: float, deterministic: bool = False, seed: int = None):
+        if venv.num_envs % 2:
+            raise ValueError(f"Expected two agents per arena, got {venv.num_envs} agents")
+        if not 0.0 <= share <= 1.0:
+            raise ValueError(f"League share must be in [0, 1], got {share}")
+
+        n_arenas = venv.num_envs // 2
+        # Any positive share gets at least one league arena
+        n_league = min(math.ceil(share * n_arenas), n_arenas)
+        # Spread league arenas evenly across the row of arenas
+        league_arenas = np.linspace(0, n_arenas, n_league, endpoint=False).astype(int) if n_league else []
+        self.opponent_slots = np.array([2 * a + 1 for a in league_arenas], dtype=int)
+        self.learner_slots = np.array(
+            [i for i in range(venv.num_envs) if i not in set(self.opponent_slots.tolist())], dtype=int
+        )
+
+        # Slots must exist first: VecEnv.__init__ queries get_attr()
+        super().__init__(venv)
+        self.num_envs = len(self.learner_slots)
+        self.reset_infos = [{} for _ in range(self.num_envs)]
+
+        self.pool = pool
+        self.deterministic = deterministic
+        self.rng = np.random.default_rng(seed)
+        self.assignments = {int(slot): None for slot in self.opponent_slots}
+        self._last_obs = None
+
+    def _take(self, obs, slots):
+        if isinstance(obs, dict):
+            return {k: v[slots] for k, v in obs.items()}
+        return obs[slots]
+
+    def _venv_indices(self, indices):
+        if indices is None:
+            return self.learner_slots.tolist()
+        if isinstance(indices, int):
+            indices = [indices]
+        return [int(self.learner_slots[i]) for i in indices]
+
+    def reset(self):
+        obs = self.venv.reset()
+        self._last_obs = obs
+        return self._take(obs, self.learner_slots)
+
+    def step_async(self, actions):
+        actions = np.asarray(actions)
+        full = np.zeros((self.venv.num_envs,) + actions.shape[1:], dtype=actions.dtype)
+        full[self.learner_slots] = actions
+
+        # Group opponent slots by snapshot so each snapshot runs one forward pass
+        groups = defaultdict(list)
+        for slot, name in self.assignments.items():
+            if name not in self.pool:
+                name = self.assignments[slot] = self.pool.acquire()
+            groups[name].append(slot)
+
+        for name, slots in groups.items():
+            opponent_obs = self._take(self._last_obs, slots)
+            full[slots] = self.pool.get(name).act(opponent_obs, self.deterministic, self.rng)
+
+        self.venv.step_async(full)
+
+    def step_wait(self):
+        obs, rewards, dones, infos = self.venv.step_wait()
+        self._last_obs = obs
+
+        # Draw a fresh opponent for every arena whose episode just ended
+        for slot, name in self.assignments.items():
+            if dones[slot] and name is not None:
+                self.pool.release(name)
+                self.assignments[slot] = None
+
+        learners = self.learner_slots
+        return (
+            self._take(obs, learners),
+            rewards[learners],
+            dones[learners],
+            [infos[i] for i in learners],
+        )
+
+    def get_attr(self, attr_name, indices=None):
+        return self.venv.get_attr(attr_name, self._venv_indices(indices))
+
+    def set_attr(self, attr_name, value, indices=None):
+        return self.venv.set_attr(attr_name, value, self._venv_indices(indices))
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return self.venv.env_method(method_name, *method_args, indices=self._venv_indices(indices), **method_kwargs)
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return self.venv.env_is_wrapped(wrapper_class, self._venv_indices(indices))
+
+
+class LeagueSnapshotCallback(BaseCallback):
+    """Freezes the live policy into the opponent pool every snapshot_freq timesteps."""
+
+    def __init__(self, pool: OpponentPool, snapshot_freq: int, verbose: int = 0):
+        super().__init__(verbose)
+        self.pool = pool
+        self.snapshot_freq = snapshot_freq
+        self._last_snapshot = 0
+
+    def _on_training_start(self) -> None:
+        self._last_snapshot = self.num_timesteps
+
+    def _on_step(self) -> bool:
+        if self.num_timesteps - self._last_snapshot >= self.snapshot_freq:
+            self._last_snapshot = self.num_timesteps
+            name = f"step_{self.num_timesteps}"
+            self.pool.add_from_model(name, self.model)
+            if self.verbose:
+                print(f"[League] Added snapshot {name} (pool size {len(self.pool)})")
+        self.logger.record("league/pool_size", len(self.pool))
+        return True
@@ -0,0 +1,234 @@
+"""
+Lightweight metrics for the Sumo inference server.
+
+Each client connection owns a ConnectionMetrics object that only its handler
+thread writes to, so recording a sample is a couple of list/int updates with
+no locking on the hot path. The registry merges everything into an aggregate
+when the metrics endpoint is scraped, and serves it as Prometheus-style plain
+text from a separate local port:
+
+    curl http://127.0.0.1:11101/metrics
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Stages timed for every inference request ("cache" only with the action cache
+# enabled; cache hits skip inference/decode)
+STAGES = ("parse", "cache", "inference", "decode", "send")
+
+# Histogram bucket upper bounds in seconds (50us .. 1s)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0,
+)
+
+PREFIX = "sumo_inference"
+
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative on export)."""
+
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        # One slot per bucket plus the +Inf overflow slot
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def merge(self, other: "Histogram"):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.total += other.total
+        self.count += other.count
+
+
+class ConnectionMetrics:
+    """Counters and stage histograms for a single client connection."""
+
+    def __init__(self, client: str = None):
+        self.client = client
+        self.requests = {}  # request type -> count
+        self.errors = {}  # error kind -> count
+        self.latency = {stage: Histogram() for stage in STAGES}
+        self.pending = 0  # complete messages buffered but not yet handled
+
+    def count_request(self, kind: str):
+        self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def count_error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def observe(self, stage: str, seconds: float):
+        self.latency[stage].observe(seconds)
+
+    def merge(self, other: "ConnectionMetrics"):
+        # Copy dicts first: the owning thread may insert keys while we iterate
+        for kind, n in list(other.requests.items()):
+            self.requests[kind] = self.requests.get(kind, 0) + n
+        for kind, n in list(other.errors.items()):
+            self.errors[kind] = self.errors.get(kind, 0) + n
+        for stage in STAGES:
+            self.latency[stage].merge(other.latency[stage])
+        self.pending += other.pending
+
+
+class MetricsRegistry:
+    """Tracks live connections and totals from connections that have closed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._active = {}  # id -> ConnectionMetrics
+        self._closed = ConnectionMetrics()
+        self.started = time.time()
+        self.cache = None  # Optional ActionCache to report hit/miss counts for
+
+    def connect(self, client: str) -> ConnectionMetrics:
+        metrics = ConnectionMetrics(client)
+        with self._lock:
+            self._active[id(metrics)] = metrics
+        return metrics
+
+    def disconnect(self, metrics: ConnectionMetrics):
+        with self._lock:
+            self._active.pop(id(metrics), None)
+            metrics.pending = 0
+            self._closed.merge(metrics)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format.
+
+        Aggregates are exported as sumo_inference_* and per-connection series as
+        sumo_inference_client_* (labelled by client), so summing one family
+        never double counts the other.
+        """
+        with self._lock:
+            active = list(self._active.values())
+            total = ConnectionMetrics()
+            total.merge(self._closed)
+        for metrics in active:
+            total.merge(metrics)
+
+        lines = [
+            f"# HELP {PREFIX}_uptime_seconds Seconds since the server started",
+            f"# TYPE {PREFIX}_uptime_seconds gauge",
+            f"{PREFIX}_uptime_seconds {time.time() - self.started:.3f}",
+            f"# HELP {PREFIX}_connected_clients Currently connected clients",
+            f"# TYPE {PREFIX}_connected_clients gauge",
+            f"{PREFIX}_connected_clients {len(active)}",
+        ]
+        lines += _render_series(PREFIX, [(total, "")], "all clients")
+        lines += _render_series(
+            f"{PREFIX}_client",
+            [(m, f'client="{m.client}"') for m in active],
+            "per connected client",
+        )
+
+        if self.cache is not None:
+            cache = self.cache
+            lines += [
+                f"# HELP {PREFIX}_cache_lookups_total Action cache lookups, by result",
+                f"# TYPE {PREFIX}_cache_lookups_total counter",
+                f'{PREFIX}_cache_lookups_total{{result="hit"}} {cache.hits}',
+                f'{PREFIX}_cache_lookups_total{{result="miss"}} {cache.misses}',
+                f"# HELP {PREFIX}_cache_evictions_total Action cache LRU evictions",
+                f"# TYPE {PREFIX}_cache_evictions_total counter",
+                f"{PREFIX}_cache_evictions_total {cache.evictions}",
+                f"# HELP {PREFIX}_cache_entries Action cache entries",
+                f"# TYPE {PREFIX}_cache_entries gauge",
+                f"{PREFIX}_cache_entries {len(cache)}",
+                f"# HELP {PREFIX}_cache_hit_ratio Action cache hits / lookups",
+                f"# TYPE {PREFIX}_cache_hit_ratio gauge",
+                f"{PREFIX}_cache_hit_ratio {cache.hit_rate():.4f}",
+            ]
+
+        return "\n".join(lines) + "\n"
+
+
+def _join_labels(*labels: str) -> str:
+    return ",".join(label for label in labels if label)
+
+
+def _sample(name: str, labels: str, value) -> str:
+    return f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+
+def _render_series(prefix: str, series: list, scope: str) -> list:
+    """Render pending/request/error/latency families for (metrics, label) pairs."""
+    lines = [
+        f"# HELP {prefix}_pending_requests Messages received but not yet answered ({scope})",
+        f"# TYPE {prefix}_pending_requests gauge",
+    ]
+    for m, label in series:
+        lines.append(_sample(f"{prefix}_pending_requests", label, m.pending))
+
+    lines += [
+        f"# HELP {prefix}_requests_total Requests handled, by type ({scope})",
+        f"# TYPE {prefix}_requests_total counter",
+    ]
+    for m, label in series:
+        for kind, n in sorted(m.requests.items()):
+            labels = _join_labels(label, f'type="{kind}"')
+            lines.append(_sample(f"{prefix}_requests_total", labels, n))
+
+    lines += [
+        f"# HELP {prefix}_errors_total Errors, by kind ({scope})",
+        f"# TYPE {prefix}_errors_total counter",
+    ]
+    for m, label in series:
+        for kind, n in sorted(m.errors.items()):
+            labels = _join_labels(label, f'kind="{kind}"')
+            lines.append(_sample(f"{prefix}_errors_total", labels, n))
+
+    lines += [
+        f"# HELP {prefix}_stage_seconds Time spent per request stage ({scope})",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    for m, label in series:
+        for stage in STAGES:
+            hist = m.latency[stage]
+            labels = _join_labels(label, f'stage="{stage}"')
+            cumulative = 0
+            for bound, n in zip(LATENCY_BUCKETS, hist.counts):
+                cumulative += n
+                lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{{labels},le="+Inf"}} {hist.count}')
+            lines.append(f"{prefix}_stage_seconds_sum{{{labels}}} {hist.total:.6f}")
+            lines.append(f"{prefix}_stage_seconds_count{{{labels}}} {hist.count}")
+    return lines
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = None
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Keep scrapes out of the server console
+
+
+def start_metrics_server(registry: MetricsRegistry, host: str, port: int) -> ThreadingHTTPServer:
+    """Serve registry.render() over HTTP on a background daemon thread."""
+    handler = type("MetricsHandler", (_MetricsHandler,), {"registry": registry})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
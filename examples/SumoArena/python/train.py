@@ -4,6 +4,9 @@ Sumo RL Training Script
 
 Trains two agents to compete in sumo-style matches using self-play.
 Both agents share the same policy weights via godot_rl_agents.
+
+With --league_share > 0, that share of arenas instead pits the live policy
+against frozen past snapshots sampled from an opponent pool (see league.py).
 """
 
 import os
@@ -15,6 +18,8 @@ from stable_baselines3 import PPO
 from stable_baselines3.common.callbacks import CheckpointCallback
 from stable_baselines3.common.vec_env import VecMonitor
 
+from league import LeagueSnapshotCallback, LeagueVecEnv, OpponentPool
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Train Sumo RL agents")
@@ -59,10 +64,35 @@ def parse_args():
         default=None,
         help="Custom run name (default: timestamp)",
     )
+    parser.add_argument(
+        "--league_share",
+        type=float,
+        default=0.0,
+        help="Share of arenas playing against frozen past policies (default: 0, pure self-play)",
+    )
+    parser.add_argument(
+        "--league_pool_size",
+        type=int,
+        default=8,
+        help="Max frozen snapshots kept in memory, least recently used evicted (default: 8)",
+    )
+    parser.add_argument(
+        "--league_snapshot_freq",
+        type=int,
+        default=50_000,
+        help="Add a snapshot of the live policy to the pool every N steps (default: 50000)",
+    )
+    parser.add_argument(
+        "--league_checkpoints",
+        type=str,
+        default=None,
+        help="Directory of sumo_ppo_*.zip checkpoints to seed the opponent pool with",
+    )
     return parser.parse_args()
 
 
-def make_env(n_envs: int = 1, viz: bool = True, seed: int = 42):
+def make_env(n_envs: int = 1, viz: bool = True, seed: int = 42,
+             pool: OpponentPool = None, league_share: float = 0.0):
     """Create the Godot environment wrapped for Stable Baselines3."""
     env = StableBaselinesGodotEnv(
         env_path=None,  # None = connect to already running Godot instance
@@ -70,6 +100,9 @@ def make_env(n_envs: int = 1, viz: bool = True, seed: int = 42):
         n_parallel=n_envs,
         seed=seed,
     )
+    if pool is not None and league_share > 0:
+        # Opponent slots are hidden from the learner (and from VecMonitor)
+        env = LeagueVecEnv(env, pool, league_share, seed=seed)
     # VecMonitor adds episode statistics (rewards, lengths)
     return VecMonitor(env)
 
@@ -98,14 +131,21 @@ def main():
     print(f"Environments:  {args.n_envs}")
     print(f"Checkpoints:   every {args.checkpoint_freq:,} steps")
     print(f"Visualization: {args.viz}")
+    if args.league_share > 0:
+        print(f"League:        {args.league_share:.0%} of arenas (at least one), pool of {args.league_pool_size}")
     print(f"Output dir:    {run_dir}")
     print("=" * 50)
 
     # Create environment
     print("\nConnecting to Godot...")
     print("(Make sure Godot is running with the training_arena scene)")
-    env = make_env(n_envs=args.n_envs, viz=args.viz, seed=args.seed)
+    pool = OpponentPool(max_size=args.league_pool_size, seed=args.seed) if args.league_share > 0 else None
+    env = make_env(n_envs=args.n_envs, viz=args.viz, seed=args.seed,
+                   pool=pool, league_share=args.league_share)
     print(f"Connected! Observation space: {env.observation_space}")
+    if pool is not None:
+        league_env = env.venv  # VecMonitor -> LeagueVecEnv
+        print(f"           League arenas: {len(league_env.opponent_slots)} of {league_env.venv.num_envs // 2}")
     print(f"           Action space: {env.action_space}")
 
     # Create or load model
@@ -135,6 +175,16 @@ def main():
             # Note: seed not passed - godot_rl doesn't support env.seed()
         )
 
+    callbacks = []
+    if pool is not None:
+        if args.league_checkpoints:
+            # Leave room for the live snapshot added below
+            n_loaded = pool.load_checkpoints(args.league_checkpoints, reserve=1)
+            print(f"League: loaded {n_loaded} checkpoints from {args.league_checkpoints}")
+        # The current policy is always a valid opponent from the first step
+        pool.add_from_model(f"step_{model.num_timesteps}", model)
+        callbacks.append(LeagueSnapshotCallback(pool, args.league_snapshot_freq, verbose=1))
+
     # Checkpoint callback
     # save_freq is in rollout steps (calls to _on_step), not raw timesteps
     # With PPO n_steps=2048, each _on_step = 2048 timesteps
@@ -152,6 +202,7 @@ def main():
         save_vecnormalize=False,
         verbose=1,
     )
+    callbacks.append(checkpoint_callback)
 
     # Train!
     print("\nStarting training...")
@@ -161,7 +212,7 @@ def main():
     try:
         model.learn(
             total_timesteps=args.timesteps,
-            callback=checkpoint_callback,
+            callback=callbacks,
             progress_bar=True,
             reset_num_timesteps=args.resume is None,
         )
@@ -0,0 +1,359 @@
+"""Benchmark CPU inference of every exported ONNX policy under examples/.
+
+Input shapes are read from each graph and filled with synthetic observations,
+then every model is timed across batch sizes, intra-op thread counts and graph
+optimization levels. Results are written as JSON (for tooling and baselines)
+and Markdown (for reading). Pass a previous JSON report with --baseline to
+flag configurations whose median latency regressed.
+
+Usage:
+    python scripts/benchmark_onnx.py --batch_sizes 1,16,128 --threads 1,4
+    python scripts/benchmark_onnx.py --baseline benchmark_results/onnx_benchmark.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+OPT_LEVELS = {
+    "disabled": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+DTYPES = {
+    "tensor(float)": np.float32,
+    "tensor(double)": np.float64,
+    "tensor(float16)": np.float16,
+    "tensor(int64)": np.int64,
+    "tensor(int32)": np.int32,
+    "tensor(bool)": np.bool_,
+}
+
+
+def find_models(root: Path, name_filter: str = None):
+    models = sorted(p for p in root.rglob("*.onnx") if "addons" not in p.parts)
+    if name_filter:
+        models = [p for p in models if name_filter in str(p)]
+    return models
+
+
+def display_path(path: Path) -> str:
+    try:
+        return path.resolve().relative_to(REPO_ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def model_size(model_path: Path) -> int:
+    """Size of the model file plus its external weights (.onnx.data), if any."""
+    data_path = model_path.with_name(model_path.name + ".data")
+    return sum(p.stat().st_size for p in (model_path, data_path) if p.exists())
+
+
+def make_session(model_path: Path, threads: int, opt_level: str) -> ort.InferenceSession:
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = OPT_LEVELS[opt_level]
+    return ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+
+
+def describe(args_list):
+    return [{"name": a.name, "shape": [d if isinstance(d, int) else str(d) for d in a.shape], "type": a.type}
+            for a in args_list]
+
+
+def synthetic_inputs(session: ort.InferenceSession, batch_size: int, rng: np.random.Generator) -> dict:
+    """Build random feeds matching the graph inputs; symbolic dims become batch_size (first) or 1."""
+    feeds = {}
+    for arg in session.get_inputs():
+        shape = []
+        for i, dim in enumerate(arg.shape):
+            if isinstance(dim, int) and dim > 0:
+                if i == 0 and dim != batch_size:
+                    raise ValueError(f"input '{arg.name}' has fixed batch dim {dim}")
+                shape.append(dim)
+            else:
+                shape.append(batch_size if i == 0 else 1)
+        dtype = DTYPES.get(arg.type)
+        if dtype is None:
+            raise ValueError(f"unsupported input type {arg.type}")
+        if arg.name == "obs":
+            feeds[arg.name] = rng.uniform(-1.0, 1.0, size=shape).astype(dtype)
+        else:
+            # godot_rl exports carry a dummy recurrent state (state_ins)
+            feeds[arg.name] = np.zeros(shape, dtype=dtype)
+    return feeds
+
+
+def time_session(session, feeds, warmup: int, iterations: int, min_time: float) -> np.ndarray:
+    for _ in range(warmup):
+        session.run(None, feeds)
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < iterations or time.perf_counter() - start < min_time:
+        t0 = time.perf_counter()
+        session.run(None, feeds)
+        latencies.append(time.perf_counter() - t0)
+    return np.array(latencies)
+
+
+def benchmark_model(model_path: Path, args, rng: np.random.Generator) -> dict:
+    entry = {"model": display_path(model_path), "size_bytes": model_size(model_path), "results": []}
+    try:
+        session = make_session(model_path, 1, "all")
+    except Exception as e:
+        entry["error"] = str(e).strip().splitlines()[0]
+        return entry
+    entry["inputs"] = describe(session.get_inputs())
+    entry["outputs"] = describe(session.get_outputs())
+
+    for opt_level in args.opt_levels:
+        for threads in args.threads:
+            try:
+                session = make_session(model_path, threads, opt_level)
+            except Exception as e:
+                # Record the failure for this config and keep benchmarking the rest
+                error = str(e).strip().splitlines()[0]
+                entry["results"] += [
+                    {"opt_level": opt_level, "threads": threads, "batch_size": batch_size, "error": error}
+                    for batch_size in args.batch_sizes
+                ]
+                continue
+            for batch_size in args.batch_sizes:
+                try:
+                    feeds = synthetic_inputs(session, batch_size, rng)
+                    latencies = time_session(session, feeds, args.warmup, args.iterations, args.min_time)
+                except Exception as e:
+                    entry["results"].append({
+                        "opt_level": opt_level, "threads": threads, "batch_size": batch_size,
+                        "error": str(e).strip().splitlines()[0],
+                    })
+                    continue
+                mean = float(latencies.mean())
+                entry["results"].append({
+                    "opt_level": opt_level,
+                    "threads": threads,
+                    "batch_size": batch_size,
+                    "runs": len(latencies),
+                    "mean_ms": mean * 1e3,
+                    "p50_ms": float(np.percentile(latencies, 50)) * 1e3,
+                    "p90_ms": float(np.percentile(latencies, 90)) * 1e3,
+                    "p99_ms": float(np.percentile(latencies, 99)) * 1e3,
+                    "samples_per_s": batch_size / mean,
+                })
+    return entry
+
+
+def config_key(model: str, result: dict):
+    return (model, result["opt_level"], result["threads"], result["batch_size"])
+
+
+def compare_to_baseline(report: dict, baseline_path: Path, threshold: float) -> list:
+    """Annotate results with their baseline p50 and return the regressed ones."""
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    previous = {
+        config_key(m["model"], r): r["p50_ms"]
+        for m in baseline.get("models", []) for r in m.get("results", []) if "p50_ms" in r
+    }
+    regressions = []
+    for model in report["models"]:
+        for result in model["results"]:
+            old = previous.get(config_key(model["model"], result))
+            if old is None or "p50_ms" not in result:
+                continue
+            result["baseline_p50_ms"] = old
+            result["ratio"] = result["p50_ms"] / old
+            if result["ratio"] > threshold:
+                regressions.append((model["model"], result))
+    return regressions
+
+
+def write_markdown(report: dict, path: Path, regressions: list):
+    env = report["environment"]
+    lines = [
+        "# ONNX Inference Benchmark",
+        "",
+        f"- Date: {report['created']}",
+        f"- onnxruntime {env['onnxruntime']}, Python {env['python']}, {env['platform']}",
+        f"- CPU: {env['processor'] or 'unknown'} ({env['cpu_count']} logical cores)",
+        f"- Warmup {report['settings']['warmup']}, at least {report['settings']['iterations']} runs"
+        f" / {report['settings']['min_time']}s per configuration",
+        "",
+    ]
+    if "baseline" in report:
+        lines += [f"Compared against `{report['baseline']}` "
+                  f"(regression = p50 above {report['settings']['regression_threshold']:.2f}x the baseline).", ""]
+        if regressions:
+            lines += ["## Regressions", ""]
+            for model, r in regressions:
+                lines.append(f"- `{model}` opt={r['opt_level']} threads={r['threads']} batch={r['batch_size']}: "
+                             f"{r['baseline_p50_ms']:.3f} ms -> {r['p50_ms']:.3f} ms ({r['ratio']:.2f}x)")
+            lines.append("")
+
+    for model in report["models"]:
+        lines += [f"## {model['model']}", ""]
+        if "error" in model:
+            lines += [f"Failed to load: `{model['error']}`", ""]
+            continue
+        shapes = ", ".join(f"{a['name']} {a['shape']}" for a in model["inputs"])
+        lines += [f"Inputs: {shapes}  ", f"Size: {model['size_bytes'] / 1024:.1f} KiB", ""]
+        has_baseline = any("ratio" in r for r in model["results"])
+        header = "| opt | threads | batch | p50 ms | p90 ms | p99 ms | samples/s |"
+        divider = "|---|---:|---:|---:|---:|---:|---:|"
+        if has_baseline:
+            header += " vs baseline |"
+            divider += "---:|"
+        lines += [header, divider]
+        for r in model["results"]:
+            if "error" in r:
+                lines.append(f"| {r['opt_level']} | {r['threads']} | {r['batch_size']} | {r['error']} |")
+                continue
+            row = (f"| {r['opt_level']} | {r['threads']} | {r['batch_size']} | {r['p50_ms']:.3f} | "
+                   f"{r['p90_ms']:.3f} | {r['p99_ms']:.3f} | {r['samples_per_s']:,.0f} |")
+            if has_baseline:
+                row += f" {r['ratio']:.2f}x |" if "ratio" in r else " - |"
+            lines.append(row)
+        lines.append("")
+
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def parse_int_list(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ONNX policies exported in examples/")
+    parser.add_argument(
+        "--root",
+        help="Directory to search for .onnx files",
+        default=str(REPO_ROOT / "examples"),
+        type=str,
+    )
+    parser.add_argument(
+        "--filter",
+        help="Only benchmark models whose path contains this substring",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--batch_sizes",
+        help="Comma separated batch sizes",
+        default="1,8,32,128",
+        type=parse_int_list,
+    )
+    parser.add_argument(
+        "--threads",
+        help="Comma separated intra-op thread counts",
+        default="1,4",
+        type=parse_int_list,
+    )
+    parser.add_argument(
+        "--opt_levels",
+        help=f"Comma separated graph optimization levels ({', '.join(OPT_LEVELS)})",
+        default="basic,all",
+        type=lambda v: [level for level in v.split(",") if level],
+    )
+    parser.add_argument("--warmup", help="Untimed runs per configuration", default=10, type=int)
+    parser.add_argument("--iterations", help="Minimum timed runs per configuration", default=200, type=int)
+    parser.add_argument("--min_time", help="Minimum seconds timed per configuration", default=0.2, type=float)
+    parser.add_argument("--seed", help="Seed for synthetic observations", default=0, type=int)
+    parser.add_argument(
+        "--output_dir",
+        help="Where to write onnx_benchmark.json and onnx_benchmark.md",
+        default=str(REPO_ROOT / "benchmark_results"),
+        type=str,
+    )
+    parser.add_argument(
+        "--baseline",
+        help="Previous onnx_benchmark.json to compare against",
+        default=None,
+        type=str,
+    )
+    parser.add_argument(
+        "--regression_threshold",
+        help="Flag configurations whose p50 is this many times slower than the baseline",
+        default=1.2,
+        type=float,
+    )
+    args = parser.parse_args()
+
+    unknown = [level for level in args.opt_levels if level not in OPT_LEVELS]
+    if unknown:
+        parser.error(f"unknown optimization level(s): {', '.join(unknown)}")
+
+    models = find_models(Path(args.root), args.filter)
+    if not models:
+        print(f"No .onnx files found under {args.root}")
+        return 1
+
+    rng = np.random.default_rng(args.seed)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "onnxruntime": ort.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "settings": {
+            "batch_sizes": args.batch_sizes,
+            "threads": args.threads,
+            "opt_levels": args.opt_levels,
+            "warmup": args.warmup,
+            "iterations": args.iterations,
+            "min_time": args.min_time,
+            "seed": args.seed,
+            "regression_threshold": args.regression_threshold,
+        },
+        "models": [],
+    }
+
+    for i, model_path in enumerate(models, 1):
+        print(f"[{i}/{len(models)}] {display_path(model_path)}")
+        entry = benchmark_model(model_path, args, rng)
+        if "error" in entry:
+            print(f"    skipped: {entry['error']}")
+        else:
+            fastest = max((r for r in entry["results"] if "samples_per_s" in r),
+                          key=lambda r: r["samples_per_s"], default=None)
+            if fastest:
+                print(f"    best: {fastest['samples_per_s']:,.0f} samples/s "
+                      f"(batch {fastest['batch_size']}, {fastest['threads']} threads, opt {fastest['opt_level']})")
+        report["models"].append(entry)
+
+    regressions = []
+    if args.baseline:
+        report["baseline"] = args.baseline
+        regressions = compare_to_baseline(report, Path(args.baseline), args.regression_threshold)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    json_path = output_dir / "onnx_benchmark.json"
+    md_path = output_dir / "onnx_benchmark.md"
+    json_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    write_markdown(report, md_path, regressions)
+    print(f"\nWrote {json_path} and {md_path}")
+
+    if regressions:
+        print(f"{len(regressions)} configuration(s) regressed beyond {args.regression_threshold:.2f}x")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())